@@ -12,6 +12,7 @@ import sys
 import re
 import os
 import json
+from functools import lru_cache
 
 
 def parse_args(argv):
@@ -34,56 +35,121 @@ def read_diff(opts):
         if sys.stdin.isatty():
             print("Error: no diff provided. Pipe a diff via stdin or use --diff-file=PATH", file=sys.stderr)
             sys.exit(1)
+        # Universal newlines, like open() above: parse_diff expects \n line ends
+        sys.stdin.reconfigure(newline=None)
         return sys.stdin.read()
 
 
+DIFF_HEADER_RE = re.compile(r'^diff --git a/([^\r\n]*) b/([^\r\n]*)', re.MULTILINE)
+ADDED_LINE_RE = re.compile(r'^\+(?!\+\+)([^\r\n]*)', re.MULTILINE)
+DELETED_LINE_RE = re.compile(r'^-(?!--)([^\r\n]*)', re.MULTILINE)
+NEW_FILE_RE = re.compile(r'^new file mode', re.MULTILINE)
+DELETED_FILE_RE = re.compile(r'^deleted file mode', re.MULTILINE)
+
+
 def parse_diff(raw):
     """Parse unified diff into structured file-level info."""
+    # Each file section is scanned with findall() over a pos/endpos window of
+    # raw, so the per-line work runs inside the regex engine and the buffer is
+    # never split or sliced.
+    headers = list(DIFF_HEADER_RE.finditer(raw))
     files = []
-    current = None
-    for line in raw.splitlines():
-        # Detect file header
-        m = re.match(r'^diff --git a/(.*) b/(.*)', line)
-        if m:
-            current = {
-                "old_path": m.group(1),
-                "new_path": m.group(2),
-                "is_new": False,
-                "is_deleted": False,
-                "added_lines": [],
-                "deleted_lines": [],
-            }
-            files.append(current)
-            continue
-        if current is None:
-            continue
-        if line.startswith("new file mode"):
-            current["is_new"] = True
-        elif line.startswith("deleted file mode"):
-            current["is_deleted"] = True
-        elif line.startswith("+") and not line.startswith("+++"):
-            current["added_lines"].append(line[1:])
-        elif line.startswith("-") and not line.startswith("---"):
-            current["deleted_lines"].append(line[1:])
+    for i, m in enumerate(headers):
+        start = m.end()
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(raw)
+        # File mode lines only appear before the first hunk
+        hunks = raw.find("\n@@", start, end)
+        meta_end = end if hunks < 0 else hunks
+        files.append({
+            "old_path": m.group(1),
+            "new_path": m.group(2),
+            "is_new": NEW_FILE_RE.search(raw, start, meta_end) is not None,
+            "is_deleted": DELETED_FILE_RE.search(raw, start, meta_end) is not None,
+            "added_lines": ADDED_LINE_RE.findall(raw, start, end),
+            "deleted_lines": DELETED_LINE_RE.findall(raw, start, end),
+        })
     return files
 
 
 # --------------- type detection ---------------
 
-BUG_KEYWORDS = re.compile(r'\b(fix|bug|error|issue|patch|crash|fault|defect|broken|wrong|incorrect)\b', re.IGNORECASE)
-CHORE_PATTERNS = re.compile(
-    r'(^\.gitignore$|^Makefile$|^Dockerfile$|^docker-compose|^\.github/|^\.circleci/|^\.gitlab-ci'
-    r'|^Jenkinsfile$|^package\.json$|^package-lock\.json$|^yarn\.lock$|^Gemfile$|^Gemfile\.lock$'
-    r'|^\.eslintrc|^\.prettierrc|^tsconfig|^setup\.cfg$|^setup\.py$|^pyproject\.toml$'
-    r'|^Cargo\.toml$|^Cargo\.lock$|^go\.mod$|^go\.sum$|^\.env)'
+BUG_WORDS = ("fix", "bug", "error", "issue", "patch", "crash", "fault", "defect", "broken", "wrong", "incorrect")
+BUG_KEYWORDS = re.compile(r'\b(' + '|'.join(BUG_WORDS) + r')\b', re.IGNORECASE)
+# Path classification uses plain string checks (set membership and tuple
+# startswith/endswith) rather than regex alternations.
+CHORE_FILES = {
+    ".gitignore", "Makefile", "Dockerfile", "Jenkinsfile",
+    "package.json", "package-lock.json", "yarn.lock", "Gemfile", "Gemfile.lock",
+    "setup.cfg", "setup.py", "pyproject.toml", "Cargo.toml", "Cargo.lock", "go.mod", "go.sum",
+}
+CHORE_PREFIXES = (
+    "docker-compose", ".github/", ".circleci/", ".gitlab-ci",
+    ".eslintrc", ".prettierrc", "tsconfig", ".env",
 )
-DOC_PATTERNS = re.compile(r'(\.md$|^README|^docs/|^CHANGELOG|^LICENSE|^CONTRIBUTING)', re.IGNORECASE)
-TEST_PATTERNS = re.compile(r'(test_|_test\.|\.test\.|\.spec\.|/tests/|/test/|/__tests__/)', re.IGNORECASE)
+# Doc and test checks are case-insensitive and run on the lowercased path
+DOC_SUFFIXES = (".md",)
+DOC_PREFIXES = ("readme", "docs/", "changelog", "license", "contributing")
+TEST_MARKERS = ("test_", "_test.", ".test.", ".spec.", "/tests/", "/test/", "/__tests__/")
+FUNC_WORDS = ("def ", "function ", "class ", "const ", "export ")
+FUNC_PATTERN = re.compile(r'^\s*(def |function |class |const \w+ = |export )', re.MULTILINE)
 
 
 def _normalize_ws(s):
     """Strip all whitespace for style-change comparison."""
-    return re.sub(r'\s+', '', s)
+    # str.split() drops the same characters as \s but without a regex pass
+    return "".join(s.split())
+
+
+def is_test_path(path):
+    """Check whether path looks like a test file."""
+    lower = path.lower()
+    return any(m in lower for m in TEST_MARKERS)
+
+
+def is_doc_path(path):
+    """Check whether path looks like documentation."""
+    lower = path.lower()
+    return lower.endswith(DOC_SUFFIXES) or lower.startswith(DOC_PREFIXES)
+
+
+def is_chore_path(path):
+    """Check whether path is a build, CI or project config file."""
+    return path in CHORE_FILES or path.startswith(CHORE_PREFIXES)
+
+
+@lru_cache(maxsize=4096)
+def classify_path(path):
+    """Return the signal a path implies on its own ("test", "docs", "chore"), or None.
+
+    Cached because the same paths recur when many diffs are analysed in one process.
+    """
+    if is_test_path(path):
+        return "test"
+    if is_doc_path(path):
+        return "docs"
+    if is_chore_path(path):
+        return "chore"
+    return None
+
+
+def has_bug_keyword(text):
+    """Check text for a whole-word bug keyword.
+
+    Plain substring checks run in C and rule out most text cheaply; the
+    word-boundary regex only runs when one of them hits.
+    """
+    lower = text.lower()
+    if not any(w in lower for w in BUG_WORDS):
+        return False
+    return BUG_KEYWORDS.search(text) is not None
+
+
+def has_func_def(text):
+    """Check text for a line that starts a new function, class or export."""
+    # Same substring prefilter as has_bug_keyword: most added text has none
+    if not any(w in text for w in FUNC_WORDS):
+        return False
+    return FUNC_PATTERN.search(text) is not None
 
 
 def is_style_only(f):
@@ -93,7 +159,7 @@ def is_style_only(f):
     if abs(len(f["added_lines"]) - len(f["deleted_lines"])) > max(1, len(f["added_lines"]) // 3):
         return False
     for a, d in zip(f["added_lines"], f["deleted_lines"]):
-        if _normalize_ws(a) != _normalize_ws(d):
+        if a != d and _normalize_ws(a) != _normalize_ws(d):
             return False
     return True
 
@@ -110,119 +176,97 @@ def is_refactor(f):
     return ratio > 0.5 and a >= 3
 
 
+# Signal names in tie-break order: on equal counts the earlier one wins
+SIGNAL_ORDER = ("feat", "fix", "test", "docs", "chore", "style", "refactor")
+_SIGNAL_RANK = {name: i for i, name in enumerate(SIGNAL_ORDER)}
+
+
+def file_signal(f):
+    """Classify a single parsed file into the commit type it points to."""
+    # Test, doc and chore / config files
+    path_signal = classify_path(f["new_path"])
+    if path_signal:
+        return path_signal
+
+    # New file -> feat
+    if f["is_new"]:
+        return "feat"
+
+    # Bug-related keywords in added lines -> fix
+    added_text = "\n".join(f["added_lines"])
+    if has_bug_keyword(added_text):
+        return "fix"
+
+    # Style-only
+    if is_style_only(f):
+        return "style"
+
+    # Refactor heuristic
+    if is_refactor(f):
+        return "refactor"
+
+    # New functions/classes added to existing file -> feat
+    if has_func_def(added_text):
+        return "feat"
+
+    # Fallback
+    return "chore"
+
+
 def detect_type(files):
     """Determine commit type from parsed file info."""
     if not files:
         return "chore"
 
-    # Collect per-file signals
-    signals = {
-        "feat": 0, "fix": 0, "test": 0, "docs": 0,
-        "chore": 0, "style": 0, "refactor": 0,
-    }
+    # Count per-file signals, tracking the highest one as we go
+    signals = dict.fromkeys(SIGNAL_ORDER, 0)
+    best, best_count = "chore", 0
 
     for f in files:
-        path = f["new_path"]
-
-        # Test files
-        if TEST_PATTERNS.search(path):
-            signals["test"] += 1
-            continue
-
-        # Doc files
-        if DOC_PATTERNS.search(path):
-            signals["docs"] += 1
-            continue
-
-        # Chore / config files
-        if CHORE_PATTERNS.search(path):
-            signals["chore"] += 1
-            continue
+        name = file_signal(f)
+        count = signals[name] + 1
+        signals[name] = count
+        if count > best_count or (count == best_count and _SIGNAL_RANK[name] < _SIGNAL_RANK[best]):
+            best, best_count = name, count
 
-        # New file -> feat
-        if f["is_new"]:
-            signals["feat"] += 1
-            continue
-
-        # Bug-related keywords in added lines -> fix
-        added_text = "\n".join(f["added_lines"])
-        if BUG_KEYWORDS.search(added_text):
-            signals["fix"] += 1
-            continue
-
-        # Style-only
-        if is_style_only(f):
-            signals["style"] += 1
-            continue
-
-        # Refactor heuristic
-        if is_refactor(f):
-            signals["refactor"] += 1
-            continue
-
-        # New functions/classes added to existing file -> feat
-        func_pattern = re.compile(r'^\s*(def |function |class |const \w+ = |export )')
-        if any(func_pattern.match(l) for l in f["added_lines"]):
-            signals["feat"] += 1
-            continue
-
-        # Fallback
-        signals["chore"] += 1
-
-    # Pick highest signal
-    best = max(signals, key=lambda k: signals[k])
-    if signals[best] == 0:
-        return "chore"
     return best
 
 
 # --------------- scope detection ---------------
 
+def _top_level(path):
+    """Top-level directory of path, or the filename without extension for root files."""
+    slash = path.find("/")
+    if slash >= 0:
+        return path[:slash]
+    return os.path.splitext(path)[0]
+
+
 def detect_scope(files):
     """Derive scope from the most-changed directory or file."""
     if not files:
         return ""
 
-    # Count changes per file
+    # Count changes per path; a path repeated in the diff keeps its last count
     change_counts = {}
     for f in files:
-        path = f["new_path"]
-        count = len(f["added_lines"]) + len(f["deleted_lines"])
-        change_counts[path] = count
-
-    if not change_counts:
-        return ""
-
-    # If single file
-    if len(change_counts) == 1:
-        path = list(change_counts.keys())[0]
-        parts = path.split("/")
-        if len(parts) == 1:
-            # Root-level file: use filename without extension
-            name = parts[0]
-            return os.path.splitext(name)[0].lower()
-        else:
-            return parts[0].lower()
+        change_counts[f["new_path"]] = len(f["added_lines"]) + len(f["deleted_lines"])
 
-    # Multiple files: find the most-changed file's directory
-    most_changed = max(change_counts, key=change_counts.get)
+    # Collect top-level dirs and track the most-changed file's in one pass
     dirs = set()
-    for path in change_counts:
-        parts = path.split("/")
-        if len(parts) > 1:
-            dirs.add(parts[0])
-        else:
-            dirs.add(os.path.splitext(parts[0])[0])
-
-    # If all in the same top-level dir, use that
+    most_changed_dir, most_changed_count = "", -1
+    for path, count in change_counts.items():
+        top = _top_level(path)
+        dirs.add(top)
+        if count > most_changed_count:
+            most_changed_dir, most_changed_count = top, count
+
+    # If all in the same top-level dir (or a single file), use that
     if len(dirs) == 1:
         return dirs.pop().lower()
 
     # Use most-changed file's directory
-    parts = most_changed.split("/")
-    if len(parts) > 1:
-        return parts[0].lower()
-    return os.path.splitext(parts[0])[0].lower()
+    return most_changed_dir.lower()
 
 
 # --------------- summary generation ---------------
@@ -3,16 +3,19 @@
 
 import json
 import os
-import re
 import subprocess
 import sys
-from pathlib import Path
+from collections.abc import Generator, Iterable
+from itertools import islice
 
 DOC_PATTERNS = {".md", ".txt", ".rst", ".adoc"}
 CONFIG_PATTERNS = {".json", ".yml", ".yaml", ".toml", ".ini", ".cfg", ".conf", ".env"}
 TEST_PATTERNS = {"test", "spec", "__tests__", "tests"}
 FIX_KEYWORDS = {"fix", "bug", "error", "patch", "issue", "crash", "broken"}
 PERF_KEYWORDS = {"perf", "optimize", "cache", "speed", "fast", "slow", "memory"}
+SOURCE_ROOTS = {"src", "lib", "app", "pkg"}
+# Diff lines are scanned in blocks of this many lines rather than one by one
+SCAN_BLOCK_LINES = 4096
 
 
 def git(args: list[str], repo: str = ".") -> tuple[int, str]:
@@ -20,26 +23,32 @@ def git(args: list[str], repo: str = ".") -> tuple[int, str]:
     return result.returncode, result.stdout.strip()
 
 
-def get_staged_files(repo: str) -> list[dict]:
-    code, output = git(["diff", "--cached", "--name-status"], repo)
-    if code != 0 or not output:
-        return []
-    files = []
-    for line in output.split("\n"):
-        if not line.strip():
-            continue
-        parts = line.split("\t", 1)
-        if len(parts) == 2:
-            files.append({"status": parts[0][0], "path": parts[1]})
-    return files
+def git_stream(args: list[str], repo: str = ".") -> Generator[str, None, None]:
+    """Yield git's stdout line by line instead of buffering the whole output."""
+    with subprocess.Popen(["git", "-C", repo] + args, stdout=subprocess.PIPE,
+                          stderr=subprocess.DEVNULL, text=True, bufsize=1 << 20) as proc:
+        yield from proc.stdout
+
 
+def get_staged_changes(repo: str) -> tuple[list[dict], Generator[str, None, None]]:
+    """Read staged file statuses and the patch from a single git invocation.
 
-def get_diff_content(repo: str) -> str:
-    code, output = git(["diff", "--cached"], repo)
-    return output if code == 0 else ""
+    --patch-with-raw prints one raw record per file before the patch, so the
+    file list is parsed up front and the rest of the stream is handed back
+    unread for detect_type.
+    """
+    lines = git_stream(["diff", "--cached", "--patch-with-raw"], repo)
+    files = []
+    for line in lines:
+        # ":<old mode> <new mode> <old sha> <new sha> <status>\t<path>"
+        if not line.startswith(":"):
+            break
+        meta, _, path = line.rstrip("\n").partition("\t")
+        files.append({"status": meta.split()[-1][0], "path": path})
+    return files, lines
 
 
-def detect_type(files: list[dict], diff_content: str) -> str:
+def detect_type(files: list[dict], diff_lines: Iterable[str]) -> str:
     if not files:
         return "chore"
 
@@ -55,24 +64,35 @@ def detect_type(files: list[dict], diff_content: str) -> str:
         return "test"
 
     # All doc files
-    if all(Path(p).suffix.lower() in DOC_PATTERNS for p in paths):
+    if all(os.path.splitext(p)[1].lower() in DOC_PATTERNS for p in paths):
         return "docs"
 
     # All config files
-    if all(Path(p).suffix.lower() in CONFIG_PATTERNS for p in paths):
+    if all(os.path.splitext(p)[1].lower() in CONFIG_PATTERNS for p in paths):
         return "chore"
 
-    # Check diff content for keywords
-    diff_lower = diff_content.lower()
-    if any(kw in diff_lower for kw in FIX_KEYWORDS):
-        return "fix"
-
-    if any(kw in diff_lower for kw in PERF_KEYWORDS):
+    # Check diff content for keywords and count changed lines in one pass,
+    # a block of lines at a time so each check is a single C-level scan
+    has_perf = False
+    added = removed = 0
+    lines = iter(diff_lines)
+    while True:
+        # Leading newline so the block's first line counts as a line start
+        block = "\n" + "".join(islice(lines, SCAN_BLOCK_LINES))
+        if block == "\n":
+            break
+        block_lower = block.lower()
+        if any(kw in block_lower for kw in FIX_KEYWORDS):
+            return "fix"
+        if not has_perf and any(kw in block_lower for kw in PERF_KEYWORDS):
+            has_perf = True
+        added += block.count("\n+") - block.count("\n+++")
+        removed += block.count("\n-") - block.count("\n---")
+
+    if has_perf:
         return "perf"
 
     # More deletions than additions
-    added = diff_lower.count("\n+") - diff_lower.count("\n+++")
-    removed = diff_lower.count("\n-") - diff_lower.count("\n---")
     if removed > added and removed > 5:
         return "refactor"
 
@@ -83,33 +103,28 @@ def detect_scope(files: list[dict]) -> str:
     if not files:
         return ""
 
-    # Find common directory prefix
-    dirs = []
-    for f in files:
-        parts = Path(f["path"]).parts
-        if len(parts) > 1:
-            dirs.append(parts[1] if parts[0] in ("src", "lib", "app", "pkg") and len(parts) > 2 else parts[0] if parts[0] not in ("src", "lib", "app", "pkg") else (parts[1] if len(parts) > 1 else ""))
-        # Root-level files have no scope
-
-    if not dirs or all(d == "" for d in dirs):
-        return ""
-
-    # Most common non-empty directory
+    # Count top-level directories, looking one level deeper under source roots
     dir_counts: dict[str, int] = {}
-    for d in dirs:
+    for f in files:
+        parts = f["path"].split("/", 2)
+        if len(parts) < 2:
+            # Root-level files have no scope
+            continue
+        d = parts[1] if parts[0] in SOURCE_ROOTS else parts[0]
         if d:
             dir_counts[d] = dir_counts.get(d, 0) + 1
 
     if not dir_counts:
         return ""
 
+    # Most common directory
     return max(dir_counts, key=dir_counts.get)
 
 
 def generate_subject(files: list[dict], commit_type: str) -> str:
     if len(files) == 1:
         path = files[0]["path"]
-        name = Path(path).name
+        name = os.path.basename(path)
         status = files[0]["status"]
         if status == "A":
             return f"add {name}"
@@ -121,7 +136,7 @@ def generate_subject(files: list[dict], commit_type: str) -> str:
         # Multiple files
         file_count = len(files)
         if commit_type == "docs":
-            names = [Path(f["path"]).name for f in files[:3]]
+            names = [os.path.basename(f["path"]) for f in files[:3]]
             return "update " + " and ".join(names) if len(names) <= 2 else f"update {file_count} doc files"
         elif commit_type == "test":
             return f"update {file_count} test files"
@@ -188,19 +203,19 @@ def main():
         else:
             i += 1
 
-    # Verify repo
-    code, _ = git(["rev-parse", "--git-dir"], repo)
-    if code != 0:
-        print(f"Error: {repo} is not a git repository", file=sys.stderr)
-        sys.exit(2)
-
-    files = get_staged_files(repo)
+    files, diff_lines = get_staged_changes(repo)
     if not files:
+        diff_lines.close()
+        # Only probe the repo once the diff came back empty
+        code, _ = git(["rev-parse", "--git-dir"], repo)
+        if code != 0:
+            print(f"Error: {repo} is not a git repository", file=sys.stderr)
+            sys.exit(2)
         print("Error: no staged changes found. Stage files with git add first.", file=sys.stderr)
         sys.exit(1)
 
-    diff_content = get_diff_content(repo)
-    commit_type = override_type or detect_type(files, diff_content)
+    commit_type = override_type or detect_type(files, diff_lines)
+    diff_lines.close()
     scope = override_scope if override_scope is not None else detect_scope(files)
     subject = generate_subject(files, commit_type)
 
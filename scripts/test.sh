@@ -3,6 +3,7 @@ set -euo pipefail
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 ANALYZE="$SCRIPT_DIR/analyze.py"
+RUN="$SCRIPT_DIR/run.py"
 
 PASS=0
 FAIL=0
@@ -350,6 +351,150 @@ DIFFEOF
 )
 run_test_exact_type "Style-only changes -> style" "$DIFF_STYLE" "style"
 
+# --- Test 13: CRLF line endings ---
+DIFF_CRLF=$'diff --git a/x.py b/x.py\r\n--- a/x.py\r\n+++ b/x.py\r\n@@ -1 +1 @@\r\n-a\r\n+b fix\r\n'
+run_test_exact_type "CRLF line endings -> fix" "$DIFF_CRLF" "fix"
+
+# --- Test 14: bare CR line endings ---
+DIFF_CR=$'diff --git a/x.py b/x.py\r--- a/x.py\r+++ b/x.py\r@@ -1 +1 @@\r-a\r+b fix\r'
+run_test_exact_type "Bare CR line endings -> fix" "$DIFF_CR" "fix"
+
+# --- Test: non-UTF-8 (Latin-1) diff under the C locale ---
+DIFF_LATIN1=$'diff --git a/x.py b/x.py\n--- a/x.py\n+++ b/x.py\n@@ -1 +1 @@\n-a\n+caf\xe9 fix\n'
+LATIN1_OUTPUT=$(printf '%s' "$DIFF_LATIN1" | LC_ALL=C python3 "$ANALYZE" 2>&1) || true
+if [ "$LATIN1_OUTPUT" = "fix(x): fix issue in x.py" ]; then
+    PASS=$((PASS + 1))
+    echo "  PASS: Latin-1 diff under LC_ALL=C -> fix"
+else
+    FAIL=$((FAIL + 1))
+    ERRORS="${ERRORS}\n  FAIL: Latin-1 diff under LC_ALL=C\n    expected: fix(x): fix issue in x.py\n    got: $LATIN1_OUTPUT"
+    echo "  FAIL: Latin-1 diff under LC_ALL=C"
+    echo "    expected: fix(x): fix issue in x.py"
+    echo "    got: $LATIN1_OUTPUT"
+fi
+
+# --- Test 15: Repeated path keeps its last section's count for scope ---
+DIFF_DUP_PATH=$(cat <<'DIFFEOF'
+diff --git a/core/x.py b/core/x.py
+--- a/core/x.py
++++ b/core/x.py
+@@ -1,5 +1,5 @@
+-a
+-b
++c
++d
++e
+diff --git a/api/y.py b/api/y.py
+--- a/api/y.py
++++ b/api/y.py
+@@ -1,2 +1,1 @@
+-a
+-b
++c
+diff --git a/core/x.py b/core/x.py
+--- a/core/x.py
++++ b/core/x.py
+@@ -9 +9 @@
++z
+DIFFEOF
+)
+DUP_OUTPUT=$(echo "$DIFF_DUP_PATH" | python3 "$ANALYZE" --format=json 2>&1) || true
+DUP_SCOPE=$(echo "$DUP_OUTPUT" | python3 -c "import sys,json; print(json.load(sys.stdin)['scope'])" 2>/dev/null) || DUP_SCOPE="PARSE_ERROR"
+
+if [ "$DUP_SCOPE" = "api" ]; then
+    PASS=$((PASS + 1))
+    echo "  PASS: Repeated path -> scope=api"
+else
+    FAIL=$((FAIL + 1))
+    ERRORS="${ERRORS}\n  FAIL: Repeated path -> scope\n    expected: api\n    got: $DUP_SCOPE"
+    echo "  FAIL: Repeated path -> scope"
+    echo "    expected: api"
+    echo "    got: $DUP_SCOPE"
+fi
+
+# --- Path classification: prefix and case-insensitive rules ---
+path_diff() {
+    printf 'diff --git a/%s b/%s\n--- a/%s\n+++ b/%s\n@@ -1 +1,2 @@\n line\n+added\n' "$1" "$1" "$1" "$1"
+}
+run_test_exact_type "CI workflow -> chore" "$(path_diff .github/workflows/ci.yml)" "chore"
+run_test_exact_type "docker-compose variant -> chore" "$(path_diff docker-compose.prod.yml)" "chore"
+run_test_exact_type "tsconfig variant -> chore" "$(path_diff tsconfig.base.json)" "chore"
+run_test_exact_type "docs/ non-markdown -> docs" "$(path_diff docs/guide.txt)" "docs"
+run_test_exact_type "Lowercase readme -> docs" "$(path_diff readme.rst)" "docs"
+run_test_exact_type "__tests__ directory -> test" "$(path_diff src/__tests__/a.js)" "test"
+
+# === run.py (staged changes in a git repo) ===
+echo ""
+echo "--- run.py ---"
+
+run_git_test() {
+    local name="$1"
+    local expected="$2"
+    local expected_code="$3"
+    shift 3
+
+    local output code=0
+    output=$(python3 "$RUN" "$@" 2>&1) || code=$?
+
+    if [ "$code" = "$expected_code" ] && echo "$output" | grep -qF -- "$expected"; then
+        PASS=$((PASS + 1))
+        echo "  PASS: $name"
+    else
+        FAIL=$((FAIL + 1))
+        ERRORS="${ERRORS}\n  FAIL: $name\n    expected exit $expected_code containing: $expected\n    got exit $code: $output"
+        echo "  FAIL: $name"
+        echo "    expected exit $expected_code containing: $expected"
+        echo "    got exit $code: $output"
+    fi
+}
+
+GIT_TMP=$(mktemp -d)
+trap 'rm -rf "$GIT_TMP"' EXIT
+# Keep git from discovering a repository above the temp dir
+export GIT_CEILING_DIRECTORIES="$GIT_TMP"
+REPO="$GIT_TMP/repo"
+mkdir -p "$REPO/src/auth" "$GIT_TMP/not-a-repo"
+git -C "$REPO" init -q
+git_commit() { git -C "$REPO" -c user.name=test -c user.email=test@example.com commit -qm "$1"; }
+
+# --- Test 16: Not a git repository -> exit 2 ---
+run_git_test "Not a git repository -> exit 2" "is not a git repository" 2 --repo "$GIT_TMP/not-a-repo"
+
+# --- Test 17: Nothing staged -> exit 1 ---
+run_git_test "Nothing staged -> exit 1" "no staged changes" 1 --repo "$REPO"
+
+# --- Test 18: Rename record -> type, scope and body ---
+printf 'def login():\n    return True\n' > "$REPO/src/auth/login.py"
+git -C "$REPO" add -A
+git_commit "add login"
+git -C "$REPO" mv src/auth/login.py src/auth/session.py
+run_git_test "Rename -> feat(auth)" "feat(auth): update session.py" 0 --repo "$REPO"
+run_git_test "Rename -> body lists renamed file" "(renamed)" 0 --repo "$REPO" --body
+git_commit "rename login"
+
+# --- Test 19: Fix keyword early in a large diff -> fix ---
+python3 -c "
+print('# Fix crash on empty input')
+for i in range(300000):
+    print(f'value_{i} = {i}')
+" > "$REPO/src/auth/session.py"
+git -C "$REPO" add -A
+run_git_test "Large diff with early fix keyword -> fix" "fix(auth): update session.py" 0 --repo "$REPO"
+run_git_test "Type override -> chore(auth)" "chore(auth): update session.py" 0 --repo "$REPO" --type chore
+
+# With --type the diff stream is left unread; abandoning it must not put
+# anything (BrokenPipeError, ResourceWarning, git messages) on stderr
+OVERRIDE_STDERR=$(python3 -W error::ResourceWarning "$RUN" --repo "$REPO" --type chore 2>&1 >/dev/null) || true
+if [ -z "$OVERRIDE_STDERR" ]; then
+    PASS=$((PASS + 1))
+    echo "  PASS: Type override -> nothing on stderr"
+else
+    FAIL=$((FAIL + 1))
+    ERRORS="${ERRORS}\n  FAIL: Type override -> nothing on stderr\n    stderr: $OVERRIDE_STDERR"
+    echo "  FAIL: Type override -> nothing on stderr"
+    echo "    stderr: $OVERRIDE_STDERR"
+fi
+
 # --- Summary ---
 echo ""
 echo "=== Results: $PASS passed, $FAIL failed ==="